@@ -0,0 +1,262 @@
+"""
+End-to-end load test of the mint flow against local stand-ins.
+
+Starts an OIDC/JWKS stand-in, a Udemy fixture server, a Hardhat node with
+CertificateNFT deployed and the backend itself, then ramps up virtual
+users that each loop over:
+
+    POST /api/verify_certificate -> POST /api/sign-mint -> POST /api/relay-mint
+
+and prints p50/p95/p99 latency and error rate per endpoint for every
+concurrency level, plus the level at which throughput stops scaling.
+
+Usage (from backend/, needs node deps installed in hardhat_backend/ and
+Chrome/chromedriver for the Udemy scraper):
+
+    python -m loadtest.run --pdf cert.pdf --udemy-name "Jane Doe" \\
+        --udemy-course "Course title" --users 1,2,4,8 --duration 60
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from loadtest.stubs import OIDCStandIn, UdemyFixture
+from utils.admission import percentile
+HARDHAT_DIR = os.path.abspath(os.path.join(BACKEND_DIR, "..", "hardhat_backend"))
+
+# Well-known Hardhat dev accounts #0 (deployer, contract owner) and #1
+ISSUER_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+RELAYER_KEY = "0x59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d"
+
+ENDPOINTS = ("verify_certificate", "sign-mint", "relay-mint")
+
+
+def wait_for(url, timeout_sec, method="GET", json_body=None):
+    deadline = time.time() + timeout_sec
+    while time.time() < deadline:
+        try:
+            r = httpx.request(method, url, json=json_body, timeout=2)
+            if r.status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout_sec}s")
+
+
+def start_hardhat(rpc_port, contract_dir):
+    node = subprocess.Popen(
+        ["npx", "hardhat", "node", "--port", str(rpc_port)],
+        cwd=HARDHAT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    rpc_url = f"http://127.0.0.1:{rpc_port}"
+    wait_for(rpc_url, 60, method="POST",
+             json_body={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []})
+    subprocess.run(
+        ["npx", "hardhat", "run", "scripts/deploy.js", "--network", "localhost"],
+        cwd=HARDHAT_DIR, check=True,
+        env={**os.environ, "CONTRACT_OUT_DIR": contract_dir, "LOCALHOST_RPC_URL": rpc_url, "ISSUER_ADDRESS": ""},
+    )
+    return node, rpc_url
+
+
+def start_backend(port, env):
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=os.path.join(BACKEND_DIR, "src"), env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_for(f"{base_url}/api/verify_certificate/metrics", 120)
+    return app, base_url
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.journeys = 0
+
+    def record(self, endpoint, started, response, check=None):
+        self.latencies[endpoint].append((time.monotonic() - started) * 1000)
+        if response.status_code >= 400:
+            self.statuses[endpoint][response.status_code] += 1
+            self.errors[endpoint] += 1
+            return False
+        if check is not None and not check(response):
+            self.statuses[endpoint]["check_failed"] += 1
+            self.errors[endpoint] += 1
+            return False
+        self.statuses[endpoint][response.status_code] += 1
+        return True
+
+    def record_failure(self, endpoint, started):
+        self.latencies[endpoint].append((time.monotonic() - started) * 1000)
+        self.statuses[endpoint]["exc"] += 1
+        self.errors[endpoint] += 1
+
+
+async def _call(client, stats, endpoint, method, url, check=None, **kwargs):
+    started = time.monotonic()
+    try:
+        r = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        stats.record_failure(endpoint, started)
+        return None
+    return r if stats.record(endpoint, started, r, check) else None
+
+
+def _is_verified(response):
+    # A 200 with is_verified false means OCR or the Udemy fixture disagree
+    try:
+        return bool(response.json().get("is_verified"))
+    except ValueError:
+        return False
+
+
+async def virtual_user(vu_id, client, base_url, oidc, pdfs, stop_at, stats):
+    headers = {"Authorization": f"Bearer {oidc.issue_token(f'loadtest-vu-{vu_id}')}"}
+    i = 0
+    while time.monotonic() < stop_at:
+        # A trailing comment after %%EOF gives every upload its own digest, so the
+        # backend's request coalescing does not fold concurrent verifies together
+        pdf = pdfs[(vu_id + i) % len(pdfs)] + f"\n%loadtest {vu_id}-{i}-{secrets.token_hex(8)}\n".encode()
+        i += 1
+
+        r = await _call(client, stats, "verify_certificate", "POST", f"{base_url}/api/verify_certificate",
+                        check=_is_verified, files={"file": ("certificate.pdf", pdf, "application/pdf")})
+        if r is None:
+            continue
+
+        # Fresh recipient and pdfHash so the contract never rejects a reused hash
+        mint = {
+            "to": "0x" + secrets.token_hex(20),
+            "tokenURI": f"ipfs://loadtest/{vu_id}/{i}",
+            "pdfHash": "0x" + secrets.token_hex(32),
+        }
+        r = await _call(client, stats, "sign-mint", "POST", f"{base_url}/api/sign-mint",
+                        json=mint, headers=headers)
+        if r is None:
+            continue
+        signed = r.json()
+
+        r = await _call(client, stats, "relay-mint", "POST", f"{base_url}/api/relay-mint",
+                        json={**mint, "deadline": signed["deadline"], "signature": signed["signature"]},
+                        headers=headers)
+        # Journeys still in flight at stop_at run to completion but do not count,
+        # so journeys / duration is the throughput of the stage window itself
+        if r is not None and time.monotonic() <= stop_at:
+            stats.journeys += 1
+
+
+async def run_stage(users, duration_sec, base_url, oidc, pdfs):
+    stats = Stats()
+    stop_at = time.monotonic() + duration_sec
+    limits = httpx.Limits(max_connections=users * 2)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        before = (await client.get(f"{base_url}/api/verify_certificate/metrics")).json()
+        started = time.monotonic()
+        await asyncio.gather(*(
+            virtual_user(vu, client, base_url, oidc, pdfs, stop_at, stats) for vu in range(users)
+        ))
+        # Only queue waits from this stage, not earlier levels still in the backend's buffer
+        window = time.monotonic() - started
+        metrics = (await client.get(f"{base_url}/api/verify_certificate/metrics",
+                                    params={"window_sec": window})).json()
+    # The backend counters are cumulative; report this stage's share only
+    for counter in ("rejected", "coalesced"):
+        metrics[counter] -= before[counter]
+    return stats, metrics
+
+
+def report_stage(users, duration_sec, stats, metrics):
+    print(f"\n=== {users} virtual user(s), {duration_sec}s ===")
+    print(f"{'endpoint':<20}{'reqs':>7}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for endpoint in ENDPOINTS:
+        lat = stats.latencies[endpoint]
+        err_pct = 100.0 * stats.errors[endpoint] / len(lat) if lat else 0.0
+        statuses = dict(stats.statuses[endpoint])
+        print(f"{endpoint:<20}{len(lat):>7}{err_pct:>8.1f}{percentile(lat, 50):>10.0f}"
+              f"{percentile(lat, 95):>10.0f}{percentile(lat, 99):>10.0f}  {statuses}")
+    throughput = stats.journeys / duration_sec
+    print(f"completed journeys: {stats.journeys} ({throughput:.2f}/s)")
+    print(f"verify queue: rejected={metrics['rejected']} coalesced={metrics['coalesced']} "
+          f"wait p95={metrics['wait_ms']['p95']:.0f}ms")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", action="append", required=True, help="certificate PDF to upload (repeatable)")
+    parser.add_argument("--udemy-name", required=True, help="recipient name the Udemy fixture returns")
+    parser.add_argument("--udemy-course", required=True, help="course title the Udemy fixture returns")
+    parser.add_argument("--users", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=int, default=60, help="seconds per concurrency level")
+    parser.add_argument("--port", type=int, default=8100, help="port for the backend under test")
+    parser.add_argument("--rpc-port", type=int, default=8545, help="port for the Hardhat node")
+    parser.add_argument("--max-error-rate", type=float, default=5.0,
+                        help="error %% above which a level counts as saturated")
+    args = parser.parse_args()
+
+    pdfs = []
+    for path in args.pdf:
+        with open(path, "rb") as f:
+            pdfs.append(f.read())
+    levels = [int(x) for x in args.users.split(",") if x.strip()]
+
+    oidc = OIDCStandIn()
+    udemy = UdemyFixture(args.udemy_name, args.udemy_course)
+    processes = []
+    with tempfile.TemporaryDirectory() as contract_dir:
+        try:
+            node, rpc_url = start_hardhat(args.rpc_port, contract_dir)
+            processes.append(node)
+            app, base_url = start_backend(args.port, {
+                "RPC_URL": rpc_url,
+                "CONTRACT_JSON_PATH": os.path.join(contract_dir, "CertificateNFT.json"),
+                "ISSUER_PRIVATE_KEY": ISSUER_KEY,
+                "RELAYER_PRIVATE_KEY": RELAYER_KEY,
+                "CIVIC_ISSUER": oidc.issuer,
+                "CIVIC_ALLOW_CONFIGURED_ISSUER": "1",
+                "CIVIC_AUDIENCE": "",
+                "UDEMY_LINK": udemy.link,
+                "RL_USER_MAX": "1000000",
+            })
+            processes.append(app)
+
+            previous, saturation = None, None
+            for users in levels:
+                stats, metrics = asyncio.run(run_stage(users, args.duration, base_url, oidc, pdfs))
+                throughput = report_stage(users, args.duration, stats, metrics)
+                total = sum(len(stats.latencies[e]) for e in ENDPOINTS)
+                error_rate = 100.0 * sum(stats.errors.values()) / total if total else 0.0
+                scaling_stopped = previous is not None and throughput < previous * 1.1
+                if saturation is None and (error_rate > args.max_error_rate or scaling_stopped):
+                    saturation = users
+                previous = throughput if previous is None else max(previous, throughput)
+
+            if saturation is None:
+                print(f"\nNo saturation up to {levels[-1]} virtual users")
+            else:
+                print(f"\nSaturation point: {saturation} virtual users")
+        finally:
+            for proc in reversed(processes):
+                proc.terminate()
+                proc.wait()
+            udemy.shutdown()
+            oidc.shutdown()
+
+
+if __name__ == "__main__":
+    main()
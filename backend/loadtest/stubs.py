@@ -0,0 +1,115 @@
+"""
+Local stand-ins for the external services used by the mint flow:
+
+- an OIDC issuer with discovery + JWKS that signs test tokens accepted by
+  ``verify_civic_token``;
+- a Udemy certificate page fixture that ``scrap_udemy`` can scrape.
+"""
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+KID = "loadtest-key"
+
+
+def _serve(handler_cls, port):
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_cls)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class OIDCStandIn:
+    """Minimal OIDC issuer: discovery document, JWKS and a token endpoint."""
+
+    def __init__(self, port=0, audience=None):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+        public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+        public_jwk.update({"kid": KID, "use": "sig", "alg": "RS256"})
+        self.jwks = {"keys": [public_jwk]}
+        self.audience = audience
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/.well-known/openid-configuration":
+                    self._json({"issuer": stand_in.issuer, "jwks_uri": f"{stand_in.issuer}/jwks"})
+                elif self.path == "/jwks":
+                    self._json(stand_in.jwks)
+                elif self.path.startswith("/token"):
+                    sub = self.path.partition("sub=")[2] or "loadtest-user"
+                    self._json({"id_token": stand_in.issue_token(sub)})
+                else:
+                    self.send_error(404)
+
+        self.server = _serve(Handler, port)
+        self.issuer = f"http://127.0.0.1:{self.server.server_port}"
+
+    def issue_token(self, sub, ttl_sec=3600):
+        now = int(time.time())
+        claims = {"iss": self.issuer, "sub": sub, "iat": now, "exp": now + ttl_sec}
+        if self.audience:
+            claims["aud"] = self.audience
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": KID})
+
+    def shutdown(self):
+        self.server.shutdown()
+
+
+class UdemyFixture:
+    """Serves /certificate/<id>/ with the elements ``scrap_udemy`` reads."""
+
+    def __init__(self, username, course_name, port=0):
+        page = (
+            "<html><body>"
+            f'<a data-purpose="certificate-recipient-url">{html.escape(username)}</a>'
+            f'<a data-purpose="certificate-course-url">{html.escape(course_name)}</a>'
+            "</body></html>"
+        ).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if not self.path.startswith("/certificate/"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+        self.server = _serve(Handler, port)
+        self.link = f"http://127.0.0.1:{self.server.server_port}/certificate/"
+
+    def shutdown(self):
+        self.server.shutdown()
@@ -1,15 +1,31 @@
 # main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import uvicorn
 
 from routes import router
+from utils.parser import get_easyocr_reader
 
 load_dotenv()
 
-app = FastAPI(title="Mint Backend (FastAPI)")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the EasyOCR model once per worker instead of on the first low-confidence ID.
+    # A failed preload (e.g. models not downloadable) must not keep the API down;
+    # the reader is then loaded lazily on first use.
+    if os.getenv("EASYOCR_PRELOAD", "1") == "1":
+        try:
+            get_easyocr_reader()
+        except Exception as e:
+            print("[WARN] EasyOCR preload failed, will load lazily:", e)
+    yield
+
+
+app = FastAPI(title="Mint Backend (FastAPI)", lifespan=lifespan)
 
 CORS_ORIGIN = os.getenv("CORS_ORIGIN", "http://localhost:5173")
 app.add_middleware(
@@ -22,5 +38,6 @@ app.add_middleware(
 
 app.include_router(router)
 
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True)
@@ -1,4 +1,5 @@
 # routes.py
+import hashlib
 import io
 import json
 import os
@@ -16,6 +17,7 @@ from pydantic import BaseModel
 # Your existing utils
 from utils.main_util import verify_certificate
 from utils.build_merkle_tree import build_merkle_proofs
+from utils.admission import AdmissionController
 
 # Web3 / signing
 from web3 import Web3
@@ -38,6 +40,9 @@ RELAYER_PRIVATE_KEY = os.getenv("RELAYER_PRIVATE_KEY", ISSUER_PRIVATE_KEY)  # op
 CIVIC_ISSUER = os.getenv("CIVIC_ISSUER", "https://auth.civic.com/oauth")
 CIVIC_AUDIENCE = os.getenv("CIVIC_AUDIENCE")  # your Civic client ID
 CIVIC_JWKS_URL = os.getenv("CIVIC_JWKS_URL")  # optional override
+# Opt-in for local OIDC stand-ins (load tests): accept a token whose iss is exactly
+# CIVIC_ISSUER even if it is not https://*.civic.com. Never enable in production.
+CIVIC_ALLOW_CONFIGURED_ISSUER = os.getenv("CIVIC_ALLOW_CONFIGURED_ISSUER", "0") == "1"
 
 ALLOWLIST_WALLETS = set(
     a.strip().lower() for a in os.getenv("ALLOWLIST_WALLETS", "").split(",") if a.strip()
@@ -48,6 +53,12 @@ RL_USER_MAX = int(os.getenv("RL_USER_MAX", "10"))
 RL_USER_WINDOW_MS = int(os.getenv("RL_USER_WINDOW_MS", "60000"))
 _user_hits: Dict[str, List[float]] = {}
 
+# Admission control for /api/verify_certificate (each run spawns Chrome + OCR)
+VERIFY_MAX_CONCURRENCY = int(os.getenv("VERIFY_MAX_CONCURRENCY", "2"))
+VERIFY_MAX_QUEUE = int(os.getenv("VERIFY_MAX_QUEUE", "8"))
+VERIFY_RETRY_AFTER_SEC = int(os.getenv("VERIFY_RETRY_AFTER_SEC", "10"))
+verify_admission = AdmissionController(VERIFY_MAX_CONCURRENCY, VERIFY_MAX_QUEUE, VERIFY_RETRY_AFTER_SEC)
+
 if not ISSUER_PRIVATE_KEY:
     raise RuntimeError("Missing env: ISSUER_PRIVATE_KEY")
 
@@ -160,9 +171,10 @@ def verify_civic_token(bearer: str) -> Dict[str, Any]:
     if not iss:
         raise HTTPException(401, "Token missing 'iss' claim")
 
-    # Safety: ensure Civic domain
+    # Safety: ensure Civic domain, unless explicitly opted in to the configured issuer
     p = urlparse(iss)
-    if p.scheme != "https" or not p.netloc.endswith("civic.com"):
+    is_configured_issuer = CIVIC_ALLOW_CONFIGURED_ISSUER and iss.rstrip("/") == CIVIC_ISSUER.rstrip("/")
+    if not is_configured_issuer and (p.scheme != "https" or not p.netloc.endswith("civic.com")):
         raise HTTPException(401, f"Unexpected issuer host: {p.netloc}")
 
     # Discover the correct JWKS via the issuer
@@ -342,9 +354,10 @@ async def verify_certificate_endpoint(
     contents = await file.read()
     if not contents:
         raise HTTPException(status_code=400, detail="Empty file")
-    file_like = io.BytesIO(contents)
+    # Identical uploads in flight share one pipeline run
+    digest = hashlib.sha256(contents).hexdigest()
     try:
-        vc = verify_certificate(file_like)
+        vc = await verify_admission.run(digest, verify_certificate, io.BytesIO(contents))
 
         if not isinstance(vc, dict) or "fields" not in vc or not isinstance(vc["fields"], dict):
             raise HTTPException(status_code=500, detail="verify_certificate returned unexpected shape")
@@ -362,6 +375,10 @@ async def verify_certificate_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {e}")
 
+@router.get("/api/verify_certificate/metrics")
+async def verify_certificate_metrics(window_sec: Optional[float] = None):
+    return verify_admission.metrics(window_sec)
+
 # --------------------------------------------------------------------
 # New: EIP-712 signed mint + optional relay
 # --------------------------------------------------------------------
@@ -480,7 +497,9 @@ def relay_mint(inp: RelayMintIn, authorization: Optional[str] = Header(None)):
         tx.setdefault("maxPriorityFeePerGas", max(1, gas_price // 10))
 
         signed = w3.eth.account.sign_transaction(tx, private_key=RELAYER_PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
+        # eth-account >= 0.13 renamed rawTransaction to raw_transaction
+        raw_tx = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        tx_hash = w3.eth.send_raw_transaction(raw_tx)
         rcpt = w3.eth.wait_for_transaction_receipt(tx_hash)
 
         # Parse CertificateMinted
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class AdmissionController:
+    """
+    Bounded admission in front of a blocking job.
+
+    At most ``max_concurrency`` jobs run at once (in the threadpool) and at
+    most ``max_queue`` more wait for a slot; anything beyond that is turned
+    away with a 503 and a Retry-After header. Calls sharing a key while a job
+    for that key is in flight await the same result instead of running it
+    again.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, retry_after_sec: int, wait_samples: int = 1000):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after_sec = retry_after_sec
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._jobs: Set[asyncio.Task] = set()
+        self._queued = 0
+        self._running = 0
+        # (monotonic time the slot was granted, wait in ms)
+        self._waits_ms: Deque[Tuple[float, float]] = deque(maxlen=wait_samples)
+        self._counters = {"admitted": 0, "rejected": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+    async def run(self, key: str, fn: Callable[..., Any], *args) -> Any:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._counters["coalesced"] += 1
+            # shield: one waiter going away must not cancel the shared job
+            return await asyncio.shield(pending)
+
+        if self._queued + self._running >= self.max_concurrency + self.max_queue:
+            self._counters["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Verification queue is full, retry later",
+                headers={"Retry-After": str(self.retry_after_sec)},
+            )
+
+        self._counters["admitted"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._queued += 1
+        # The job is its own task so that cancelling the caller that started it
+        # neither frees its slot while the worker thread is still busy nor
+        # cancels the waiters coalesced onto it.
+        job = asyncio.ensure_future(self._job(fn, args))
+        self._jobs.add(job)
+        job.add_done_callback(lambda task: self._finish(key, future, task))
+        return await asyncio.shield(future)
+
+    async def _job(self, fn: Callable[..., Any], args) -> Any:
+        started = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        now = time.monotonic()
+        self._waits_ms.append((now, (now - started) * 1000))
+        self._running += 1
+        try:
+            return await run_in_threadpool(fn, *args)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    def _finish(self, key: str, future: asyncio.Future, task: asyncio.Task) -> None:
+        self._jobs.discard(task)
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            self._counters["failed"] += 1
+            future.cancel()
+            return
+        error = task.exception()
+        if error is not None:
+            self._counters["failed"] += 1
+            future.set_exception(error)
+            # mark retrieved so a job nobody waited on any more does not log a warning
+            future.exception()
+            return
+        self._counters["completed"] += 1
+        future.set_result(task.result())
+
+    def metrics(self, window_sec: Optional[float] = None) -> Dict[str, Any]:
+        """Current state and counters; wait_ms covers only the last ``window_sec`` if given."""
+        cutoff = time.monotonic() - window_sec if window_sec is not None else float("-inf")
+        waits = [ms for at, ms in self._waits_ms if at >= cutoff]
+        return {
+            "queue_depth": self._queued,
+            "running": self._running,
+            "in_flight_keys": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            **self._counters,
+            "wait_ms": {
+                "p50": percentile(waits, 50),
+                "p95": percentile(waits, 95),
+                "max": max(waits) if waits else 0.0,
+                "samples": len(waits),
+            },
+        }
@@ -0,0 +1,177 @@
+import re
+
+import numpy as np
+import pytesseract
+
+# Reference layout of a Udemy certificate, in pixels of a 300 DPI render
+BASE_DPI = 300
+CERT_ID_STRIP = (4830, 350, 6530, 550)  # whole certificate-number strip
+CERT_ID_BLOCKS = [
+    (4830, 350, 4960, 550),  # UC
+    (4987, 350, 5300, 550),  # block 1
+    (5308, 350, 5475, 550),  # block 2
+    (5495, 350, 5647, 550),  # block 3
+    (5670, 350, 5833, 550),  # block 4
+    (5850, 350, 6530, 550),  # block 5
+]
+
+# Where to look for the "UC-" prefix, as fractions of the page (x0, y0, x1, y1)
+ANCHOR_SEARCH_AREA = (0.5, 0.0, 1.0, 0.2)
+ANCHOR_RE = re.compile(r"^U?C-")
+# Room left of the anchor's ink when cutting the strip, in 300 DPI pixels
+ANCHOR_PAD = 20
+
+
+def scale_coords(coords, factor):
+    return tuple(int(x * factor) for x in coords)
+
+
+def clamp_box(box, size):
+    w, h = size
+    x0, y0, x1, y1 = box
+    return (max(0, x0), max(0, y0), min(w, x1), min(h, y1))
+
+
+def find_cert_id_anchor(img):
+    """
+    Look for the "UC-" prefix in the top-right band of the page.
+
+    Returns a dict with the word's page-space box, text and tesseract
+    confidence, or None when no anchor was recognized.
+    """
+    w, h = img.size
+    fx0, fy0, fx1, fy1 = ANCHOR_SEARCH_AREA
+    area = (int(w * fx0), int(h * fy0), int(w * fx1), int(h * fy1))
+    band = img.crop(area).convert('L')
+    data = pytesseract.image_to_data(band, config='--psm 11', output_type=pytesseract.Output.DICT)
+
+    best = None
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not ANCHOR_RE.match(text):
+            continue
+        top = data["top"][i]
+        # The certificate number is printed above the certificate url, keep the topmost hit
+        if best is not None and top >= best["box"][1]:
+            continue
+        left = data["left"][i]
+        best = {
+            "box": (area[0] + left, area[1] + top,
+                    area[0] + left + data["width"][i], area[1] + top + data["height"][i]),
+            "text": text,
+            "conf": float(data["conf"][i]),
+        }
+    return best
+
+
+def locate_cert_id_strip(img, dpi, anchor=None):
+    """
+    Locate the certificate-number strip on a page rendered at ``dpi``.
+
+    Returns a dict with the page-space ``box`` plus, relative to that box,
+    either reference ``blocks`` or the ``text_rows`` (top, bottom) of the
+    anchor line. With an anchor the strip starts just left of the anchor's
+    ink and the blocks are later cut at the hyphens (the reference blocks
+    are padded, so they cannot be aligned to a tight ink box). Without one
+    the reference coordinates are scaled to ``dpi``.
+    """
+    factor = dpi / BASE_DPI
+    ref = scale_coords(CERT_ID_STRIP, factor)
+    if anchor is None:
+        box = clamp_box(ref, img.size)
+        # Keep the reference blocks relative to the clamped origin
+        ox, oy = box[0] - ref[0], box[1] - ref[1]
+        blocks = [(x0 - ox, y0 - oy, x1 - ox, y1 - oy) for x0, y0, x1, y1 in cert_id_block_boxes(dpi)]
+        return {"box": box, "blocks": blocks, "text_rows": None}
+
+    ax0, ay0, _, ay1 = anchor["box"]
+    pad = int(ANCHOR_PAD * factor)
+    width, height = ref[2] - ref[0], ref[3] - ref[1]
+    cy = (ay0 + ay1) // 2
+    box = clamp_box((ax0 - pad, cy - height // 2, ax0 - pad + width + pad, cy + height // 2), img.size)
+    return {"box": box, "blocks": None, "text_rows": (ay0 - box[1], ay1 - box[1])}
+
+
+def scale_strip(strip, factor):
+    """Scale a strip from ``locate_cert_id_strip`` to another DPI."""
+    return {
+        "box": scale_coords(strip["box"], factor),
+        "blocks": [scale_coords(b, factor) for b in strip["blocks"]] if strip["blocks"] else None,
+        "text_rows": scale_coords(strip["text_rows"], factor) if strip["text_rows"] else None,
+    }
+
+
+def cert_id_block_boxes(dpi):
+    """Block boxes relative to the strip origin, scaled to ``dpi``."""
+    factor = dpi / BASE_DPI
+    sx, sy = CERT_ID_STRIP[0], CERT_ID_STRIP[1]
+    return [scale_coords((x0 - sx, y0 - sy, x1 - sx, y1 - sy), factor)
+            for x0, y0, x1, y1 in CERT_ID_BLOCKS]
+
+
+def split_cert_id_blocks(bw, text_rows=None):
+    """
+    Cut a binarized strip (dark text on white) into the six ID blocks.
+
+    Hyphens are found as runs of columns whose ink is short, vertically
+    centred on the text line and separated from neighbouring glyphs by
+    blank columns. Returns strip-relative boxes, or None unless exactly the
+    five hyphens of a certificate ID were found.
+    """
+    top, bottom = text_rows if text_rows else (0, bw.shape[0])
+    top, bottom = max(0, top), min(bw.shape[0], bottom)
+    ink = bw[top:bottom] < 128
+    if not ink.any():
+        return None
+    rows = np.flatnonzero(ink.any(axis=1))
+    line_top, line_bottom = rows[0], rows[-1]
+    line_height = line_bottom - line_top + 1
+    line_mid = (line_top + line_bottom) / 2
+
+    has_ink = ink.any(axis=0)
+    first = ink.argmax(axis=0)
+    last = ink.shape[0] - 1 - ink[::-1].argmax(axis=0)
+    extent = last - first + 1
+    centre = (first + last) / 2
+    short = has_ink & (extent <= 0.3 * line_height) & (np.abs(centre - line_mid) <= 0.25 * line_height)
+
+    hyphens = []
+    width = ink.shape[1]
+    x = 0
+    while x < width:
+        if not short[x]:
+            x += 1
+            continue
+        start = x
+        while x < width and short[x]:
+            x += 1
+        end = x  # exclusive
+        isolated = (start == 0 or not has_ink[start - 1]) and (end == width or not has_ink[end])
+        if isolated and end - start >= max(2, 0.15 * line_height):
+            hyphens.append((start, end))
+
+    if len(hyphens) != 5:
+        return None
+    edges = [0] + [x for run in hyphens for x in run] + [width]
+    h = bw.shape[0]
+    return [(edges[i], 0, edges[i + 1], h) for i in range(0, len(edges), 2)]
+
+
+# Text regions of the certificate body, as fractions of the page (x0, y0, x1, y1).
+# The regions do not overlap. The name region deliberately reaches down to the
+# "Date"/"Length" lines, because the name is taken as the line right above them.
+# These fractions have not been measured on real Udemy PDFs yet, so
+# verify_certificate still runs the full-page fallback on every mismatch.
+FIELD_REGIONS = {
+    "Course Name": (0.04, 0.25, 0.96, 0.50),
+    "Instructor": (0.04, 0.50, 0.96, 0.62),
+    "User Name & Surname": (0.04, 0.62, 0.96, 0.92),
+}
+
+
+def field_region_boxes(size):
+    w, h = size
+    return {
+        name: (int(w * x0), int(h * y0), int(w * x1), int(h * y1))
+        for name, (x0, y0, x1, y1) in FIELD_REGIONS.items()
+    }
@@ -1,11 +1,24 @@
-from utils.parser import extract_certificate_from_pdf
+from utils.parser import extract_certificate_from_pdf, extract_fields_full_page
 from utils.web_scrapper_udemy import scrap_udemy
 from dotenv import load_dotenv
+import io
 import os
 load_dotenv()
 
+# Opt-in: treat a mismatch on fields read at or above this confidence as final
+# and skip the full-page fallback. Off until the field regions are measured on
+# real certificates.
+FIELD_SKIP_FALLBACK_CONF = os.getenv("FIELD_SKIP_FALLBACK_CONF")
+COMPARED_FIELDS = ("User Name & Surname", "Course Name")
+
+
+def _matches_udemy(fields, username, course_name):
+    return fields["User Name & Surname"] == username and fields["Course Name"] == course_name
+
+
 def verify_certificate(file):
-    fields = extract_certificate_from_pdf(file)
+    file_bytes = file.read()
+    fields, confidence = extract_certificate_from_pdf(io.BytesIO(file_bytes))
     udemy_link = os.getenv("UDEMY_LINK")
     if not udemy_link:
         raise Exception("UDEMY_LINK environment variable is not set.")
@@ -13,9 +26,25 @@ def verify_certificate(file):
 
     username, course_name = scrap_udemy(certificate_url)
 
+    is_verified = _matches_udemy(fields, username, course_name)
+    udemy = {"User Name & Surname": username, "Course Name": course_name}
+    retry = [f for f in COMPARED_FIELDS if fields[f] != udemy[f]]
+    if FIELD_SKIP_FALLBACK_CONF:
+        retry = [f for f in retry if confidence.get(f, 0.0) < float(FIELD_SKIP_FALLBACK_CONF)]
+    if not is_verified and username is not None and retry:
+        print("Mismatching fields, falling back to full-page OCR:", retry)
+        full_page = extract_fields_full_page(file_bytes, cert_id=fields["Certificate ID"])
+        for f in retry:
+            if full_page[f] != "Not found":
+                fields[f] = full_page[f]
+                # The region score described the discarded value; full-page OCR has none
+                confidence.pop(f, None)
+        is_verified = _matches_udemy(fields, username, course_name)
+
     result = {
-        "is_verified": (fields["User Name & Surname"] == username and fields["Course Name"] == course_name),
+        "is_verified": is_verified,
         "fields": fields,
+        "confidence": confidence,
         "udemy_result": {"username": username, "course_name": course_name},
         "certificate_url": certificate_url
     }
@@ -1,83 +1,229 @@
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image
 import pytesseract
 from pdf2image import convert_from_bytes
 import numpy as np
 import cv2
+import io
+import os
 import re
-import easyocr
-
-def extract_certificate_parts(img):
-    base_parts = [
-        (4830, 350, 4960, 550),  # UC
-        (4987, 350, 5300, 550),  # block 1
-        (5308, 350, 5475, 550),  # block 2
-        (5495, 350, 5647, 550),  # block 3
-        (5670, 350, 5833, 550),  # block 4 
-        (5850, 350, 6530, 550),  # block 5 
-    ]
-    dpi = 400
-    factor = dpi / 300
-    scaled_parts = [scale_coords(b, factor) for b in base_parts]
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.layout import (
+    find_cert_id_anchor,
+    locate_cert_id_strip,
+    scale_strip,
+    split_cert_id_blocks,
+    field_region_boxes,
+    FIELD_REGIONS,
+)
+
+CERT_LOW_DPI = int(os.getenv("CERT_LOW_DPI", "200"))
+CERT_HIGH_DPI = int(os.getenv("CERT_HIGH_DPI", "400"))
+CERT_ID_MIN_CONF = float(os.getenv("CERT_ID_MIN_CONF", "80"))
+# Body fields were OCR'd at 400 DPI before the low-DPI path existed; set this
+# to CERT_HIGH_DPI to trade the cheaper render for that accuracy back.
+CERT_FIELDS_DPI = int(os.getenv("CERT_FIELDS_DPI", str(CERT_LOW_DPI)))
+
+CERT_ID_RE = re.compile(r"^UC-[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def is_valid_cert_id(cert_id):
+    return bool(cert_id and CERT_ID_RE.match(cert_id))
+
+
+def render_page(file_bytes, dpi):
+    pages = convert_from_bytes(file_bytes, dpi=dpi, first_page=1, last_page=1)
+    if not pages:
+        raise ValueError("No pages found in PDF")
+    return pages[0]
+
+
+def render_region(file_bytes, dpi, box):
+    """Render only ``box`` (pixels at ``dpi``) of the first page, in grayscale."""
+    x0, y0, x1, y1 = box
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf:
+        pdf.write(file_bytes)
+        pdf.flush()
+        out = subprocess.run(
+            ["pdftoppm", "-r", str(dpi), "-f", "1", "-l", "1", "-gray",
+             "-x", str(x0), "-y", str(y0), "-W", str(x1 - x0), "-H", str(y1 - y0), pdf.name],
+            capture_output=True, check=True,
+        )
+    return Image.open(io.BytesIO(out.stdout))
+
+
+def ocr_with_conf(img, config=''):
+    """Run tesseract and return (text, mean word confidence)."""
+    data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+    words = [(t.strip(), float(c)) for t, c in zip(data["text"], data["conf"]) if t.strip() and float(c) >= 0]
+    if not words:
+        return "", 0.0
+    text = ' '.join(t for t, _ in words)
+    conf = sum(c for _, c in words) / len(words)
+    return text, conf
+
+
+def preprocess_strip(img, box, contrast=2.5):
+    """
+    Crop ``box`` out of the page once and return it as a binarized uint8 array.
+
+    Contrast is applied through a lookup table (same formula as
+    ``ImageEnhance.Contrast``) and the threshold is picked with Otsu instead
+    of a fixed cut-off, so it adapts to the scan.
+    """
+    gray = np.asarray(img.crop(box).convert('L'))
+    mean = float(gray.mean())
+    lut = np.clip(mean + contrast * (np.arange(256, dtype=np.float32) - mean), 0, 255).astype(np.uint8)
+    enhanced = cv2.LUT(gray, lut)
+    _, bw = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return bw
+
+
+def normalize_cert_id(text):
+    """Pull a "UC-..." candidate out of a raw OCR line, or None."""
+    match = re.search(r"U?C-[0-9a-fA-F-]+", text.replace(' ', ''))
+    if not match:
+        return None
+    candidate = match.group(0).strip('-')
+    return candidate if candidate.startswith('U') else 'U' + candidate
+
+
+def extract_certificate_parts(img, strip_box, blocks=None, text_rows=None):
+    """
+    OCR the certificate-number strip; returns (cert_number, confidence).
+
+    ``blocks`` are strip-relative block boxes. When not given they are cut
+    at the hyphens found in the strip's ink, and if that fails the strip is
+    read as a single line.
+    """
+    bw = preprocess_strip(img, strip_box)
+    if blocks is None:
+        blocks = split_cert_id_blocks(bw, text_rows)
+    if blocks is None:
+        text, conf = ocr_with_conf(bw, config='--psm 7')
+        cert_number = normalize_cert_id(text) or text.replace(' ', '')
+        print(f"Strip OCR: {cert_number} (conf {conf:.1f})")
+        return cert_number, conf
+
     parts = []
-    for coords in scaled_parts:
-        part_img = img.crop(coords)
-        # part_img.show()
-        # Preprocessing as before...
-        gray = part_img.convert('L')
-        contrast = ImageEnhance.Contrast(gray).enhance(2.5)
-        arr = np.array(contrast)
-        _, bw = cv2.threshold(arr, 130, 255, cv2.THRESH_BINARY)
-        binarized = Image.fromarray(bw)
-        # OCR
-        part_text = pytesseract.image_to_string(binarized, config='--psm 7')
-        print("Part OCR:", part_text)
-        parts.append(part_text.strip().replace('\n', '').replace(' ', '').replace('-', ''))
+    confs = []
+    for x0, y0, x1, y1 in blocks:
+        # Slicing gives a view into the strip, no copy per block
+        block = bw[max(0, y0):y1, max(0, x0):x1]
+        if block.size == 0:
+            parts.append('')
+            confs.append(0.0)
+            continue
+        part_text, conf = ocr_with_conf(block, config='--psm 7')
+        print("Part OCR:", part_text, conf)
+        parts.append(part_text.replace(' ', '').replace('-', ''))
+        confs.append(conf)
     cert_number = '-'.join(parts)
-    print(f"Combined cert number: {cert_number}")
-    return cert_number
-
-# Old method
-def extract_certificate_id_easyocr(img):
-    print(img.size)
-    # Crop certificate number area
-    base_crop = (4830, 350, 6530, 550)  # for 300 DPI
-    dpi = 400
-    factor = dpi / 300
-    scaled_crop = scale_coords(base_crop, factor)
-    tight_crop = img.crop(scaled_crop)
-    tight_crop.show()
-
-    # Upscale for better OCR
-    w, h = tight_crop.size
-    if w < 1000:
-        tight_crop = tight_crop.resize((1000, int(1000 * h / w)), Image.LANCZOS)
+    confidence = min(confs) if confs else 0.0
+    print(f"Combined cert number: {cert_number} (conf {confidence:.1f})")
+    return cert_number, confidence
+
+
+def extract_certificate_id(file_bytes, page):
+    """
+    Read the certificate ID from ``page`` (rendered at CERT_LOW_DPI).
+
+    The "UC-" anchor usually carries the whole ID already. If not, the
+    strip is located from the anchor and OCR'd block by block; only when
+    that result fails the ID format or the confidence threshold is the
+    strip re-rendered at CERT_HIGH_DPI and read again, with EasyOCR as
+    the last resort if tesseract still is not convincing.
+    """
+    anchor = find_cert_id_anchor(page)
+    if anchor is not None:
+        cert_id = anchor["text"].rstrip('.,;:')
+        if is_valid_cert_id(cert_id) and anchor["conf"] >= CERT_ID_MIN_CONF:
+            print(f"Cert number from anchor: {cert_id} (conf {anchor['conf']:.1f})")
+            return cert_id, anchor["conf"]
 
-    # Preprocess: grayscale, contrast, binarize, sharpen
-    gray = tight_crop.convert('L')
-    contrast = ImageEnhance.Contrast(gray).enhance(2.5)
-    arr = np.array(contrast)
-    _, bw = cv2.threshold(arr, 130, 255, cv2.THRESH_BINARY)
-    binarized = Image.fromarray(bw).filter(ImageFilter.SHARPEN)
-    binarized.save("debug_binarized_easyocr.png")
+    strip = locate_cert_id_strip(page, CERT_LOW_DPI, anchor)
+    cert_id, conf = extract_certificate_parts(page, strip["box"], strip["blocks"], strip["text_rows"])
+    if is_valid_cert_id(cert_id) and conf >= CERT_ID_MIN_CONF:
+        return cert_id, conf
 
-    # Prepare both normal and inverted images for EasyOCR
-    easyocr_images = []
-    easyocr_images.append(np.array(binarized.convert("RGB")))
-    arr_inv = cv2.bitwise_not(bw)
-    binarized_inv = Image.fromarray(arr_inv).filter(ImageFilter.SHARPEN)
-    easyocr_images.append(np.array(binarized_inv.convert("RGB")))
+    print(f"Escalating certificate ID to {CERT_HIGH_DPI} DPI")
+    high = scale_strip(strip, CERT_HIGH_DPI / CERT_LOW_DPI)
+    region = render_region(file_bytes, CERT_HIGH_DPI, high["box"])
+    region_box = (0, 0) + region.size
+    cert_id, conf = extract_certificate_parts(region, region_box, high["blocks"], high["text_rows"])
+    if is_valid_cert_id(cert_id) and conf >= CERT_ID_MIN_CONF:
+        return cert_id, conf
 
-    reader = easyocr.Reader(['en'])
-    allowlist = "UCabcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-"
+    print("Asking EasyOCR for a second opinion on the certificate ID")
+    try:
+        easy_id, easy_conf = extract_certificate_id_easyocr(region, region_box)
+    except Exception as e:
+        # EasyOCR is only a second opinion; keep tesseract's answer if it cannot run
+        print("EasyOCR unavailable:", e)
+        return cert_id, conf
+    if easy_id is not None and (not is_valid_cert_id(cert_id) or easy_conf > conf):
+        return easy_id, easy_conf
+    return cert_id, conf
 
-    # **More tolerant regex: allow last block 10 to 15 chars**
-    cert_regex = r'(U?C-[A-Za-z0-9\-]{8,}-[A-Za-z0-9\-]{4,}-[A-Za-z0-9\-]{4,}-[A-Za-z0-9\-]{4,}-[A-Za-z0-9\-]{10,15})'
-    all_candidates = []
-    raise Exception("Not exist")
+EASYOCR_ALLOWLIST = "UCabcdefABCDEF0123456789-"
 
+_easyocr_reader = None
+_easyocr_lock = threading.Lock()
 
-def scale_coords(coords, factor):
-    return tuple(int(x * factor) for x in coords)
+
+def get_easyocr_reader():
+    """
+    Return the process-wide EasyOCR reader, loading it on first use.
+
+    Loading pulls in torch and the detection/recognition models, so it is
+    done once per worker process and the reader is reused afterwards.
+    """
+    global _easyocr_reader
+    if _easyocr_reader is None:
+        with _easyocr_lock:
+            if _easyocr_reader is None:
+                import easyocr
+                _easyocr_reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+    return _easyocr_reader
+
+
+def extract_certificate_id_easyocr(img, strip_box):
+    """
+    Second opinion on the certificate ID with EasyOCR.
+
+    The normal and inverted strip go through the model in a single batched
+    call. Returns (cert_id, confidence) with confidence on tesseract's 0-100
+    scale, or (None, 0.0) if no candidate matches the ID format.
+    """
+    bw = preprocess_strip(img, strip_box)
+    h, w = bw.shape
+    if w < 1000:
+        bw = cv2.resize(bw, (1000, int(1000 * h / w)), interpolation=cv2.INTER_LANCZOS4)
+    sharpen = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+    normal = cv2.filter2D(bw, -1, sharpen)
+    inverted = cv2.filter2D(cv2.bitwise_not(bw), -1, sharpen)
+
+    reader = get_easyocr_reader()
+    batches = reader.readtext_batched([normal, inverted], allowlist=EASYOCR_ALLOWLIST)
+
+    best_id, best_conf = None, 0.0
+    for detections in batches:
+        if not detections:
+            continue
+        # Reassemble the line left to right
+        detections = sorted(detections, key=lambda d: d[0][0][0])
+        text = ''.join(d[1] for d in detections).replace(' ', '')
+        conf = 100.0 * sum(d[2] for d in detections) / len(detections)
+        candidate = normalize_cert_id(text)
+        if candidate is None:
+            continue
+        print("EasyOCR candidate:", candidate, conf)
+        if is_valid_cert_id(candidate) and conf > best_conf:
+            best_id, best_conf = candidate, conf
+    return best_id, best_conf
 
 
 ### --- Part 2: General text ocr & field extraction --- ###
@@ -129,17 +275,99 @@ def extract_certificate_fields(img, cert_id=None):
     return result
 
 
+# Every region is OCR'd as a block and the field's line is picked afterwards.
+# No character whitelists: they bend non-ASCII names (ł, ś, é) onto ASCII
+# letters and turn the "Date"/"Length" lines into extra letters.
+FIELD_OCR_CONFIG = {
+    "Course Name": "--psm 6",
+    "Instructor": "--psm 6",
+    "User Name & Surname": "--psm 6",
+}
+
+# pytesseract runs tesseract as a subprocess, so threads are enough to OCR regions in parallel
+_field_pool = ThreadPoolExecutor(max_workers=len(FIELD_REGIONS), thread_name_prefix="field-ocr")
+
+
+def ocr_lines(img, config=''):
+    """Run tesseract and return [(line_text, mean word confidence)] top to bottom."""
+    data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, text in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not text.strip() or conf < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append((text.strip(), conf))
+    return [
+        (' '.join(t for t, _ in words), sum(c for _, c in words) / len(words))
+        for _, words in sorted(lines.items())
+    ]
+
+
+def pick_field(name, lines):
+    """Choose a field's value from its region's OCR lines; returns (text, conf) or (None, 0.0)."""
+    if name == "User Name & Surname":
+        # As in the full-page parser: the name is the line right above "Date"/"Length"
+        for i, (text, _) in enumerate(lines):
+            if i > 0 and re.match(r"^(Date|Length)\b", text):
+                return lines[i - 1]
+        candidates = [l for l in lines if not re.match(r"^(Date|Length)\b", l[0])]
+        return candidates[0] if candidates else (None, 0.0)
+
+    if name == "Instructor":
+        for text, conf in lines:
+            if re.match(r"^Instructors?\b", text):
+                value = re.sub(r"^Instructors?\s*", "", text).strip(" ,")
+                return (value, conf) if value else (None, 0.0)
+        return lines[0] if lines else (None, 0.0)
+
+    # Course Name: everything in the region except the certificate title
+    course = [(t, c) for t, c in lines if "CERTIFICATE" not in t]
+    if not course:
+        return None, 0.0
+    return ' '.join(t for t, _ in course), min(c for _, c in course)
+
+
+def extract_certificate_fields_regions(img, cert_id=None):
+    """
+    OCR only the course, instructor and recipient regions, in parallel.
+
+    Returns (fields, confidence) where confidence maps each field to the
+    mean tesseract word confidence of the line(s) it was taken from (0-100).
+    """
+    gray = img.convert('L')
+    boxes = field_region_boxes(gray.size)
+    futures = {
+        name: _field_pool.submit(ocr_lines, gray.crop(box), FIELD_OCR_CONFIG[name])
+        for name, box in boxes.items()
+    }
+
+    fields = {"Certificate ID": cert_id or "Not found"}
+    confidence = {}
+    for name, future in futures.items():
+        text, conf = pick_field(name, future.result())
+        fields[name] = text or "Not found"
+        confidence[name] = conf
+    print("Region OCR:", fields, confidence)
+    return fields, confidence
+
+
+def extract_fields_full_page(file_bytes, cert_id=None):
+    """Slow path: render the whole page at CERT_HIGH_DPI and OCR all of it."""
+    img = render_page(file_bytes, CERT_HIGH_DPI)
+    return extract_certificate_fields(img, cert_id=cert_id)
+
+
 def extract_certificate_from_pdf(file):
     file_bytes = file.read()
-    pages = convert_from_bytes(file_bytes, dpi=400)
-    if not pages:
-        raise ValueError("No pages found in PDF")
-    img = pages[0]
-    print("Image size at", 400, "DPI:", img.size)
+    img = render_page(file_bytes, CERT_LOW_DPI)
+    print("Image size at", CERT_LOW_DPI, "DPI:", img.size)
 
-    cert_id = extract_certificate_parts(img)
+    cert_id, cert_id_conf = extract_certificate_id(file_bytes, img)
     if cert_id is None:
         raise Exception("Cert is is None")
 
-    fields = extract_certificate_fields(img, cert_id=cert_id)
-    return fields
\ No newline at end of file
+    fields_img = img if CERT_FIELDS_DPI == CERT_LOW_DPI else render_page(file_bytes, CERT_FIELDS_DPI)
+    fields, confidence = extract_certificate_fields_regions(fields_img, cert_id=cert_id)
+    confidence["Certificate ID"] = cert_id_conf
+    return fields, confidence
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from utils.admission import AdmissionController
+
+
+def _blocking_job(release, result="done", calls=None):
+    def job():
+        if calls is not None:
+            calls.append(1)
+        assert release.wait(5)
+        return result
+    return job
+
+
+async def _until(predicate):
+    for _ in range(500):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_rejects_with_retry_after_when_full():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=1, max_queue=1, retry_after_sec=7)
+        release = threading.Event()
+        running = asyncio.ensure_future(ctl.run("a", _blocking_job(release)))
+        queued = asyncio.ensure_future(ctl.run("b", _blocking_job(release)))
+        await _until(lambda: ctl.metrics()["running"] == 1 and ctl.metrics()["queue_depth"] == 1)
+
+        with pytest.raises(HTTPException) as exc:
+            await ctl.run("c", _blocking_job(release))
+
+        release.set()
+        assert await running == "done"
+        assert await queued == "done"
+        return exc.value, ctl.metrics()
+
+    error, metrics = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "7"}
+    assert metrics["rejected"] == 1
+    assert metrics["admitted"] == 2
+    assert metrics["completed"] == 2
+
+
+def test_coalesces_requests_with_the_same_key():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=2, max_queue=0, retry_after_sec=1)
+        release = threading.Event()
+        calls = []
+        first = asyncio.ensure_future(ctl.run("same", _blocking_job(release, "shared", calls)))
+        await _until(lambda: ctl.metrics()["running"] == 1)
+        second = asyncio.ensure_future(ctl.run("same", _blocking_job(release, "other", calls)))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await first, await second, calls, ctl.metrics()
+
+    first, second, calls, metrics = asyncio.run(scenario())
+    assert first == second == "shared"
+    assert len(calls) == 1
+    assert metrics["coalesced"] == 1
+    assert metrics["in_flight_keys"] == 0
+
+
+def test_failure_reaches_every_waiter_and_clears_the_key():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=1, max_queue=0, retry_after_sec=1)
+        release = threading.Event()
+
+        def failing():
+            assert release.wait(5)
+            raise ValueError("ocr failed")
+
+        first = asyncio.ensure_future(ctl.run("k", failing))
+        await _until(lambda: ctl.metrics()["running"] == 1)
+        second = asyncio.ensure_future(ctl.run("k", failing))
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        # The key is free again, so the next call runs the job anew
+        retried = await ctl.run("k", lambda: "ok")
+        return results, retried, ctl.metrics()
+
+    results, retried, metrics = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retried == "ok"
+    assert metrics["failed"] == 1
+    assert metrics["completed"] == 1
+
+
+def test_cancelled_leader_keeps_slot_and_coalesced_waiters():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=1, max_queue=1, retry_after_sec=1)
+        release = threading.Event()
+        leader = asyncio.ensure_future(ctl.run("k", _blocking_job(release, "result")))
+        await _until(lambda: ctl.metrics()["running"] == 1)
+        follower = asyncio.ensure_future(ctl.run("k", _blocking_job(release)))
+        await asyncio.sleep(0.05)
+
+        leader.cancel()
+        await asyncio.sleep(0.05)
+        # The worker thread is still busy, so the slot is still taken
+        busy = ctl.metrics()["running"]
+
+        release.set()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await _until(lambda: ctl.metrics()["running"] == 0)
+        return busy, result, ctl.metrics()
+
+    busy, result, metrics = asyncio.run(scenario())
+    assert busy == 1
+    assert result == "result"
+    assert metrics["completed"] == 1
+
+
+def test_metrics_report_queue_waits():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=1, max_queue=2, retry_after_sec=1)
+        release = threading.Event()
+        jobs = [asyncio.ensure_future(ctl.run(str(i), _blocking_job(release))) for i in range(3)]
+        await _until(lambda: ctl.metrics()["queue_depth"] == 2)
+        during = ctl.metrics()
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(*jobs)
+        return during, ctl.metrics()
+
+    during, after = asyncio.run(scenario())
+    assert during["running"] == 1
+    assert during["max_concurrency"] == 1 and during["max_queue"] == 2
+    assert after["queue_depth"] == 0 and after["running"] == 0
+    assert after["wait_ms"]["samples"] == 3
+    assert after["wait_ms"]["max"] >= 40
+    assert after["wait_ms"]["p50"] <= after["wait_ms"]["p95"] <= after["wait_ms"]["max"]
+
+
+def test_metrics_window_excludes_older_waits():
+    async def scenario():
+        ctl = AdmissionController(max_concurrency=1, max_queue=0, retry_after_sec=1)
+        await ctl.run("old", lambda: None)
+        await asyncio.sleep(0.2)
+        await ctl.run("new", lambda: None)
+        return ctl.metrics()["wait_ms"]["samples"], ctl.metrics(window_sec=0.1)["wait_ms"]["samples"]
+
+    assert asyncio.run(scenario()) == (2, 1)
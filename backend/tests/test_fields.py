@@ -0,0 +1,74 @@
+import shutil
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.layout import FIELD_REGIONS
+from utils.parser import extract_certificate_fields_regions, pick_field
+
+
+def test_regions_do_not_overlap():
+    spans = sorted((y0, y1) for _, y0, _, y1 in FIELD_REGIONS.values())
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert end <= start
+
+
+def test_name_is_line_above_date():
+    lines = [("Ewelina Łukasiewicz", 91.0), ("Date Sep 5, 2025", 88.0), ("Length 10 total hours", 90.0)]
+
+    assert pick_field("User Name & Surname", lines) == ("Ewelina Łukasiewicz", 91.0)
+
+
+def test_name_without_date_line_skips_date_and_length():
+    lines = [("Length 10 total hours", 90.0), ("Zoé Dupont", 80.0)]
+
+    assert pick_field("User Name & Surname", lines) == ("Zoé Dupont", 80.0)
+
+
+def test_instructor_label_is_stripped():
+    lines = [("Instructors Jane Smith, John Doe", 87.0)]
+
+    assert pick_field("Instructor", lines) == ("Jane Smith, John Doe", 87.0)
+
+
+def test_course_drops_certificate_title():
+    lines = [("CERTIFICATE OF COMPLETION", 95.0), ("Spring Boot 3 &", 90.0), ("Hibernate [2025]", 70.0)]
+
+    assert pick_field("Course Name", lines) == ("Spring Boot 3 & Hibernate [2025]", 70.0)
+
+
+def test_empty_region_is_not_found():
+    for name in FIELD_REGIONS:
+        assert pick_field(name, []) == (None, 0.0)
+
+
+def _render_fixture_certificate(size=(2200, 1700)):
+    """Certificate-like page laid out on the FIELD_REGIONS bands, at ~200 DPI."""
+    page = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(page)
+    w, h = size
+    small = ImageFont.load_default(size=40)
+    large = ImageFont.load_default(size=80)
+
+    def put(y_frac, text, font):
+        draw.text((int(w * 0.06), int(h * y_frac)), text, fill="black", font=font)
+
+    put(0.28, "CERTIFICATE OF COMPLETION", small)
+    put(0.35, "Complete Python Developer", large)
+    put(0.54, "Instructors Jane Smith", small)
+    put(0.70, "John Kowalski", large)
+    put(0.80, "Date Sep 5, 2025", small)
+    put(0.85, "Length 10 total hours", small)
+    return page
+
+
+@pytest.mark.skipif(shutil.which("tesseract") is None, reason="tesseract binary not installed")
+def test_region_ocr_on_rendered_certificate():
+    page = _render_fixture_certificate()
+
+    fields, confidence = extract_certificate_fields_regions(page, cert_id="UC-test")
+
+    assert fields["User Name & Surname"] == "John Kowalski"
+    assert fields["Course Name"] == "Complete Python Developer"
+    assert fields["Instructor"] == "Jane Smith"
+    assert all(confidence[name] > 0 for name in FIELD_REGIONS)
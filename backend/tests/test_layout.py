@@ -0,0 +1,93 @@
+import numpy as np
+from PIL import Image
+
+from utils.layout import (
+    ANCHOR_PAD,
+    BASE_DPI,
+    CERT_ID_BLOCKS,
+    CERT_ID_STRIP,
+    locate_cert_id_strip,
+    split_cert_id_blocks,
+)
+
+
+def _draw_id_strip(groups, glyph_w=12, gap=4, height=60, top=20, bottom=44):
+    """White strip with black bars for glyphs and short mid-line bars for hyphens."""
+    width = 10 + sum(n * (glyph_w + gap) for n in groups) + (len(groups) - 1) * (glyph_w + 2 * gap) + 10
+    bw = np.full((height, width), 255, dtype=np.uint8)
+    x = 10
+    hyphens = []
+    for i, n in enumerate(groups):
+        for _ in range(n):
+            bw[top:bottom, x:x + glyph_w] = 0
+            x += glyph_w + gap
+        if i < len(groups) - 1:
+            x += gap
+            mid = (top + bottom) // 2
+            bw[mid - 2:mid + 2, x:x + glyph_w] = 0
+            hyphens.append((x, x + glyph_w))
+            x += glyph_w + 2 * gap
+    return bw, hyphens
+
+
+def test_split_cuts_blocks_at_hyphens():
+    bw, hyphens = _draw_id_strip([2, 8, 4, 4, 4, 12])
+
+    blocks = split_cert_id_blocks(bw)
+
+    assert blocks is not None and len(blocks) == 6
+    # No block cut lands inside a glyph: every boundary is a hyphen edge
+    for (start, end), left, right in zip(hyphens, blocks, blocks[1:]):
+        assert left[2] == start
+        assert right[0] == end
+    assert blocks[0][0] == 0 and blocks[-1][2] == bw.shape[1]
+
+
+def test_split_ignores_rows_outside_text_line():
+    bw, _ = _draw_id_strip([2, 8, 4, 4, 4, 12], height=100)
+    # Another text line (e.g. the certificate url) below the ID
+    bw[70:95, :] = 0
+
+    assert split_cert_id_blocks(bw) is None
+    assert len(split_cert_id_blocks(bw, text_rows=(20, 44))) == 6
+
+
+def test_split_needs_all_five_hyphens():
+    bw, _ = _draw_id_strip([2, 8, 4, 4, 16])
+
+    assert split_cert_id_blocks(bw) is None
+
+
+def test_locate_without_anchor_uses_reference_blocks():
+    # Page narrower than the reference strip, so its right edge gets clamped
+    page = Image.new("L", (CERT_ID_STRIP[2] - 100, 2000), 255)
+
+    strip = locate_cert_id_strip(page, BASE_DPI)
+
+    x0, y0, x1, _ = strip["box"]
+    assert (x0, y0) == CERT_ID_STRIP[:2]
+    assert x1 == page.size[0]
+    for block, ref in zip(strip["blocks"], CERT_ID_BLOCKS):
+        assert (block[0] + x0, block[1] + y0) == ref[:2]
+
+
+def test_locate_with_anchor_starts_just_left_of_ink():
+    page = Image.new("L", (8000, 2000), 255)
+    anchor = {"box": (5000, 400, 6600, 460), "text": "UC-", "conf": 90.0}
+
+    strip = locate_cert_id_strip(page, BASE_DPI, anchor)
+
+    x0, y0, _, _ = strip["box"]
+    assert x0 == 5000 - ANCHOR_PAD
+    assert strip["blocks"] is None
+    assert strip["text_rows"] == (400 - y0, 460 - y0)
+
+
+def test_locate_with_anchor_near_top_passes_clamped_offset():
+    page = Image.new("L", (8000, 2000), 255)
+    anchor = {"box": (5000, 10, 6600, 70), "text": "UC-", "conf": 90.0}
+
+    strip = locate_cert_id_strip(page, BASE_DPI, anchor)
+
+    assert strip["box"][1] == 0
+    assert strip["text_rows"] == (10, 70)
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+pytest.importorskip("seleniumwire")
+
+from utils import main_util
+
+
+def _fake_pipeline(monkeypatch, region_fields, full_page_fields, confidence):
+    monkeypatch.setenv("UDEMY_LINK", "http://udemy.test/certificate/")
+    monkeypatch.setattr(main_util, "extract_certificate_from_pdf",
+                        lambda f: (dict(region_fields), dict(confidence)))
+    monkeypatch.setattr(main_util, "scrap_udemy", lambda url: ("John Kowalski", "Python"))
+    calls = []
+
+    def full_page(file_bytes, cert_id=None):
+        calls.append(cert_id)
+        return dict(full_page_fields)
+
+    monkeypatch.setattr(main_util, "extract_fields_full_page", full_page)
+    return calls
+
+
+def test_confident_mismatch_still_falls_back(monkeypatch):
+    monkeypatch.setattr(main_util, "FIELD_SKIP_FALLBACK_CONF", None)
+    region = {"Certificate ID": "UC-1", "User Name & Surname": "John Kowalsk1", "Course Name": "Python"}
+    calls = _fake_pipeline(monkeypatch, region, {**region, "User Name & Surname": "John Kowalski"},
+                           {"User Name & Surname": 96.0, "Course Name": 95.0})
+
+    result = main_util.verify_certificate(io.BytesIO(b"%PDF"))
+
+    assert calls == ["UC-1"]
+    assert result["is_verified"]
+    assert "User Name & Surname" not in result["confidence"]
+    assert result["confidence"]["Course Name"] == 95.0
+
+
+def test_match_skips_fallback(monkeypatch):
+    region = {"Certificate ID": "UC-1", "User Name & Surname": "John Kowalski", "Course Name": "Python"}
+    calls = _fake_pipeline(monkeypatch, region, region, {"User Name & Surname": 40.0, "Course Name": 40.0})
+
+    result = main_util.verify_certificate(io.BytesIO(b"%PDF"))
+
+    assert calls == []
+    assert result["is_verified"]
+
+
+def test_opt_in_skips_fallback_for_confident_mismatch(monkeypatch):
+    monkeypatch.setattr(main_util, "FIELD_SKIP_FALLBACK_CONF", "90")
+    region = {"Certificate ID": "UC-1", "User Name & Surname": "Someone Else", "Course Name": "Python"}
+    calls = _fake_pipeline(monkeypatch, region, region, {"User Name & Surname": 96.0, "Course Name": 95.0})
+
+    result = main_util.verify_certificate(io.BytesIO(b"%PDF"))
+
+    assert calls == []
+    assert not result["is_verified"]
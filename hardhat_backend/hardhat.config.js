@@ -5,4 +5,9 @@ module.exports = {
   paths: {
     sources: "./contracts",
   },
+  networks: {
+    localhost: {
+      url: process.env.LOCALHOST_RPC_URL || "http://127.0.0.1:8545",
+    },
+  },
 };
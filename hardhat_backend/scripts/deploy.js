@@ -19,7 +19,7 @@ async function main() {
 
   const artifact = await artifacts.readArtifact("CertificateNFT");
 
-  const outDir = path.join(__dirname, "../../backend/deployed_contracts");
+  const outDir = process.env.CONTRACT_OUT_DIR || path.join(__dirname, "../../backend/deployed_contracts");
   fs.mkdirSync(outDir, { recursive: true });
 
   const chain = await ethers.provider.getNetwork();